@@ -27,9 +27,11 @@ SEED_URLS = [
 ]
 
 MAX_PAGES = 500  # Minimum number of pages to crawl
-CRAWL_DELAY = 1.0  # Delay in seconds between requests (politeness policy)
+CRAWL_DELAY = 1.0  # Initial per-domain delay in seconds for AutoThrottle (politeness policy)
 REQUEST_TIMEOUT = 10  # Timeout for HTTP requests in seconds
 MAX_DEPTH = 2  # Maximum crawl depth from seed URLs (reduced to stay focused)
+HTTP_CACHE_ENABLED = False  # Replay cached responses on re-crawls (development only)
+HTTP_CACHE_EXPIRATION = 24 * 3600  # Seconds before a cached response is re-fetched
 
 # Domain restrictions (set to None to crawl any domain, or list allowed domains)
 ALLOWED_DOMAINS = ['geeksforgeeks.org', 'w3schools.com', 'tutorialspoint.com', 'en.wikipedia.org']
@@ -55,3 +57,4 @@ INDEX_DIR = 'index_data'
 FLASK_HOST = '0.0.0.0'
 FLASK_PORT = 5001
 RESULTS_PER_PAGE = 10
+QUERY_CACHE_SIZE = 2048  # Number of recent queries whose results are cached
@@ -3,136 +3,151 @@ Indexer: Builds inverted index from crawled HTML pages.
 """
 
 import os
-import json
 import re
 import math
-from collections import defaultdict
-from bs4 import BeautifulSoup
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+import multiprocessing
+from array import array
+from collections import Counter, defaultdict
+import numpy as np
+import orjson
+from selectolax.lexbor import LexborHTMLParser
 import config
+from text_utils import STOP_WORDS, TOKEN_RE
+
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def encode_postings(doc_ids, term_offsets):
+    """Delta + varint encode each term's sorted doc numbers.
+
+    Returns the byte stream and the byte offset of each term's postings.
+    """
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    term_offsets = np.asarray(term_offsets, dtype=np.int64)
+
+    # Gaps between consecutive doc numbers; each term starts from zero
+    gaps = np.diff(doc_ids, prepend=0)
+    starts = term_offsets[:-1][term_offsets[:-1] < term_offsets[1:]]
+    gaps[starts] = doc_ids[starts]
+
+    # 7 payload bits per byte, high bit set on all but the last byte
+    nbytes = np.ones(len(gaps), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        nbytes += gaps >= (1 << shift)
+    ends = np.cumsum(nbytes)
+    begins = ends - nbytes
+
+    blob = np.empty(ends[-1] if len(ends) else 0, dtype=np.uint8)
+    for k in range(5):
+        has_byte = nbytes > k
+        payload = (gaps[has_byte] >> (7 * k)) & 0x7F
+        more = (nbytes[has_byte] > k + 1).astype(np.int64) << 7
+        blob[begins[has_byte] + k] = payload | more
+
+    byte_offsets = np.concatenate(([0], ends))[term_offsets]
+    return blob, byte_offsets
 
 
 class HTMLParser:
     """Parse HTML content and extract text."""
 
     def __init__(self):
-        # Download NLTK data if needed
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords', quiet=True)
-
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt', quiet=True)
+        self.stop_words = STOP_WORDS
 
-        self.stop_words = set(stopwords.words(config.STOP_WORDS_LANGUAGE))
-
-    def extract_text(self, html_content):
-        """Extract clean text from HTML."""
-        soup = BeautifulSoup(html_content, 'lxml')
+    def parse(self, html_content):
+        """Parse HTML once into a tree shared by the extractors."""
+        return LexborHTMLParser(html_content)
 
+    def extract_text(self, tree):
+        """Extract clean text from a parsed HTML tree."""
         # Remove script and style elements
-        for element in soup(['script', 'style', 'meta', 'link']):
+        for element in tree.css('script, style, meta, link'):
             element.decompose()
 
         # Get text
-        text = soup.get_text(separator=' ')
+        text = tree.text(separator=' ')
 
         # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         text = text.strip()
 
         return text
 
-    def extract_title(self, html_content):
-        """Extract page title from HTML."""
-        soup = BeautifulSoup(html_content, 'lxml')
-        title_tag = soup.find('title')
+    def extract_title(self, tree):
+        """Extract page title from a parsed HTML tree."""
+        title_tag = tree.css_first('title')
         if title_tag:
-            return title_tag.get_text().strip()
+            return title_tag.text().strip()
         return "Untitled"
 
     def tokenize(self, text):
         """Tokenize and normalize text."""
-        # Convert to lowercase
-        text = text.lower()
-
-        # Tokenize
-        tokens = word_tokenize(text)
+        # Extract alphabetic terms and remove stopwords
+        return [token for token in TOKEN_RE.findall(text.lower())
+                if token not in self.stop_words]
 
-        # Filter tokens
-        filtered_tokens = []
-        for token in tokens:
-            # Remove non-alphabetic tokens
-            if not token.isalpha():
-                continue
+    def analyze(self, html_content):
+        """Extract title, term frequencies and token count from HTML."""
+        # Extract title and text
+        tree = self.parse(html_content)
+        title = self.extract_title(tree)
+        text = self.extract_text(tree)
 
-            # Check length
-            if len(token) < config.MIN_TERM_LENGTH or len(token) > config.MAX_TERM_LENGTH:
-                continue
-
-            # Remove stopwords
-            if token in self.stop_words:
-                continue
+        # Tokenize
+        tokens = self.tokenize(text)
 
-            filtered_tokens.append(token)
+        # Count term frequencies
+        term_freq = Counter(tokens)
 
-        return filtered_tokens
+        return title, term_freq, len(tokens)
 
 
 class InvertedIndex:
     """Build and manage inverted index."""
 
     def __init__(self):
-        self.index = defaultdict(dict)  # term -> {doc_id: term_freq}
-        self.doc_lengths = {}  # doc_id -> document length (for normalization)
-        self.doc_info = {}  # doc_id -> {url, title, token_count}
+        # term -> (doc numbers, term freqs) as parallel uint32 / uint16 buffers
+        self.index = defaultdict(lambda: (array('I'), array('H')))
+        self.doc_info = []  # doc number -> {doc_id, url, title, token_count}
         self.total_docs = 0
         self.parser = HTMLParser()
 
     def add_document(self, doc_id, url, html_content):
         """Add a document to the index."""
-        # Extract text and title
-        text = self.parser.extract_text(html_content)
-        title = self.parser.extract_title(html_content)
+        self._merge((doc_id, url) + self.parser.analyze(html_content))
 
-        # Tokenize
-        tokens = self.parser.tokenize(text)
+    def _merge(self, result):
+        """Add an analyzed document (doc_id, url, title, term_freq, token_count)."""
+        doc_id, url, title, term_freq, token_count = result
 
-        if not tokens:
+        if not token_count:
             return
 
-        # Count term frequencies
-        term_freq = defaultdict(int)
-        for token in tokens:
-            term_freq[token] += 1
+        # Assign the next integer doc number, so postings stay sorted by doc
+        doc_num = self.total_docs
 
-        # Add to inverted index
+        # Add to inverted index (term frequencies are capped to fit uint16)
         for term, freq in term_freq.items():
-            self.index[term][doc_id] = freq
-
-        # Calculate document length (Euclidean norm for cosine similarity)
-        doc_length = math.sqrt(sum(freq ** 2 for freq in term_freq.values()))
-        self.doc_lengths[doc_id] = doc_length
+            doc_nums, freqs = self.index[term]
+            doc_nums.append(doc_num)
+            freqs.append(min(freq, 0xFFFF))
 
         # Store document info
-        self.doc_info[doc_id] = {
+        self.doc_info.append({
+            'doc_id': doc_id,
             'url': url,
             'title': title,
-            'token_count': len(tokens)
-        }
+            'token_count': token_count
+        })
 
         self.total_docs += 1
 
     def calculate_idf(self):
         """Calculate IDF (Inverse Document Frequency) for all terms."""
         self.idf = {}
-        for term, postings in self.index.items():
-            df = len(postings)  # Document frequency
+        for term, (doc_nums, _) in self.index.items():
+            df = len(doc_nums)  # Document frequency
             self.idf[term] = math.log(self.total_docs / df)
 
     def save(self, output_dir):
@@ -142,31 +157,97 @@ class InvertedIndex:
         # Calculate IDF before saving
         self.calculate_idf()
 
-        # Save inverted index
-        index_file = os.path.join(output_dir, 'inverted_index.json')
-        with open(index_file, 'w', encoding='utf-8') as f:
-            json.dump(dict(self.index), f, ensure_ascii=False, indent=2)
-
-        # Save IDF scores
-        idf_file = os.path.join(output_dir, 'idf.json')
-        with open(idf_file, 'w', encoding='utf-8') as f:
-            json.dump(self.idf, f, ensure_ascii=False, indent=2)
-
-        # Save document lengths
-        lengths_file = os.path.join(output_dir, 'doc_lengths.json')
-        with open(lengths_file, 'w', encoding='utf-8') as f:
-            json.dump(self.doc_lengths, f, ensure_ascii=False, indent=2)
+        # Save vocabulary (one term per line, line number = term number)
+        terms = sorted(self.index)
+        terms_file = os.path.join(output_dir, 'terms.txt')
+        with open(terms_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(terms))
+
+        # Concatenate postings; term_offsets[t]:term_offsets[t + 1] is term t
+        doc_ids = array('I')
+        tfs = array('H')
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            doc_nums, freqs = self.index[term]
+            doc_ids.extend(doc_nums)
+            tfs.extend(freqs)
+            term_offsets[i + 1] = len(doc_ids)
+
+        # TF-IDF weight of every posting
+        idf = np.array([self.idf[term] for term in terms], dtype=np.float64)
+        doc_nums = np.frombuffer(doc_ids, dtype=np.uint32)
+        tf_idf = np.frombuffer(tfs, dtype=np.uint16) * np.repeat(idf, np.diff(term_offsets))
+
+        # Document length: Euclidean norm of the document's TF-IDF vector
+        doc_lengths = np.sqrt(np.bincount(doc_nums, weights=tf_idf ** 2, minlength=self.total_docs))
+
+        # Store unit-length document vectors, so scoring a query term is a single
+        # multiply-add per posting and the score is a true cosine
+        norms = doc_lengths[doc_nums]
+        weights = np.divide(tf_idf, norms, out=np.zeros_like(tf_idf), where=norms > 0)
+        weights = weights.astype(np.float32)
+
+        # Largest weight of each term (upper bound for scoring)
+        max_weights = np.zeros(len(terms), dtype=np.float32)
+        nonempty = term_offsets[:-1] < term_offsets[1:]
+        if len(weights):
+            max_weights[nonempty] = np.maximum.reduceat(weights, term_offsets[:-1][nonempty])
+
+        # Compress doc numbers (sorted within each term) as varint gaps
+        postings, posting_offsets = encode_postings(doc_ids, term_offsets)
+
+        # Save inverted index, posting weights and IDF scores as uncompressed
+        # .npy arrays so the search engine can memory-map them
+        arrays = {
+            'term_offsets': term_offsets,
+            'postings': postings,
+            'posting_offsets': posting_offsets,
+            'weights': weights,
+            'idf': idf,
+            'max_weights': max_weights,
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(output_dir, f'{name}.npy'), values)
 
         # Save document info
         info_file = os.path.join(output_dir, 'doc_info.json')
-        with open(info_file, 'w', encoding='utf-8') as f:
-            json.dump(self.doc_info, f, ensure_ascii=False, indent=2)
+        with open(info_file, 'wb') as f:
+            f.write(orjson.dumps(self.doc_info))
 
         print(f"Index saved to {output_dir}")
         print(f"Total terms: {len(self.index)}")
         print(f"Total documents: {self.total_docs}")
 
 
+# HTML parser of the current pool worker
+_worker_parser = None
+
+
+def _init_worker():
+    """Create one HTML parser per pool worker."""
+    global _worker_parser
+    _worker_parser = HTMLParser()
+
+
+def _process_line(numbered_line):
+    """Analyze one crawled page (a numbered JSON Lines record) in a pool worker."""
+    line_num, line = numbered_line
+    page_data = {}
+    try:
+        page_data = orjson.loads(line)
+
+        doc_id = page_data['url_id']
+        url = page_data['url']
+        html = page_data['html']
+
+        return (doc_id, url) + _worker_parser.analyze(html)
+
+    except Exception as e:
+        url = page_data.get('url', 'unknown URL') if isinstance(page_data, dict) else 'unknown URL'
+        print(f"Error processing line {line_num} of pages.jsonl ({url}): {e}", flush=True)
+        return None
+
+
 def build_index():
     """Build inverted index from crawled pages."""
     print("Building inverted index...")
@@ -179,34 +260,30 @@ def build_index():
         print("Please run crawler.py first.")
         return
 
-    # Get all JSON files
-    files = [f for f in os.listdir(crawled_dir) if f.endswith('.json') and f != 'link_graph.json']
+    pages_file = os.path.join(crawled_dir, 'pages.jsonl')
 
-    if not files:
+    if not os.path.exists(pages_file):
         print(f"Error: No crawled pages found in {crawled_dir}")
         return
 
-    print(f"Found {len(files)} crawled pages")
-
-    # Process each page
-    for i, filename in enumerate(files, 1):
-        file_path = os.path.join(crawled_dir, filename)
+    # Stream pages and parse/tokenize them in parallel; only merging touches the index
+    num_pages = 0
+    with open(pages_file, 'rb') as f, \
+            multiprocessing.Pool(os.cpu_count(), initializer=_init_worker) as pool:
+        results = pool.imap_unordered(_process_line, enumerate(f, 1), chunksize=8)
+        for result in results:
+            num_pages += 1
+            if result is not None:
+                index._merge(result)
 
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                page_data = json.load(f)
+            if num_pages % 50 == 0:
+                print(f"Processed {num_pages} pages...")
 
-            doc_id = page_data['url_id']
-            url = page_data['url']
-            html = page_data['html']
-
-            index.add_document(doc_id, url, html)
-
-            if i % 50 == 0:
-                print(f"Processed {i}/{len(files)} pages...")
+    if num_pages == 0:
+        print(f"Error: No crawled pages found in {crawled_dir}")
+        return
 
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
+    print(f"Processed {num_pages} crawled pages")
 
     # Save index
     index.save(config.INDEX_DIR)
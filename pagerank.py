@@ -3,12 +3,38 @@ PageRank algorithm implementation.
 """
 
 import os
-import json
-import hashlib
 from collections import defaultdict
+import numpy as np
+import orjson
+from numba import njit, prange
+from scipy.sparse import csr_matrix
+import xxhash
 import config
 
 
+@njit(parallel=True, fastmath=True, cache=True)
+def _pagerank_step(indptr, indices, data, pr, dangling, damping):
+    """Run one power iteration over the transposed transition matrix (CSR)."""
+    n = len(pr)
+
+    # Pages without outgoing links spread their rank uniformly
+    dangling_mass = 0.0
+    for i in range(n):
+        if dangling[i]:
+            dangling_mass += pr[i]
+    base = (1 - damping) / n + damping * dangling_mass / n
+
+    # Each row (target page) sums rank flowing in from its sources
+    new_pr = np.empty(n)
+    for i in prange(n):
+        link_sum = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            link_sum += data[k] * pr[indices[k]]
+        new_pr[i] = base + damping * link_sum
+
+    return new_pr
+
+
 class PageRank:
     """Compute PageRank scores for web pages."""
 
@@ -16,18 +42,19 @@ class PageRank:
         self.damping = damping
         self.iterations = iterations
         self.graph = defaultdict(list)  # url -> [outgoing_urls]
-        self.pagerank = {}
+        self.url_ids = []  # position -> url_id
+        self.pr_array = np.empty(0)  # position -> PageRank score
         self.url_to_id = {}
         self.id_to_url = {}
 
     def get_url_id(self, url):
-        """Generate a unique ID for a URL."""
-        return hashlib.md5(url.encode()).hexdigest()
+        """Generate a unique 64-bit integer ID for a URL."""
+        return xxhash.xxh3_64_intdigest(url.encode())
 
     def load_graph(self, graph_file):
         """Load link graph from crawled data."""
-        with open(graph_file, 'r', encoding='utf-8') as f:
-            graph_data = json.load(f)
+        with open(graph_file, 'rb') as f:
+            graph_data = orjson.loads(f.read())
 
         # Build graph and URL mappings
         all_urls = set()
@@ -57,62 +84,59 @@ class PageRank:
             print("Error: No URLs found in graph")
             return
 
-        # Initialize PageRank scores
-        initial_pr = 1.0 / n
-        for url_id in self.id_to_url.keys():
-            self.pagerank[url_id] = initial_pr
+        # Assign integer indices to URL IDs
+        url_ids = list(self.id_to_url.keys())
+        position = {url_id: i for i, url_id in enumerate(url_ids)}
 
-        # Build reverse graph (incoming links)
-        incoming = defaultdict(list)
+        # Collect edges (source -> target) as index arrays
+        sources = []
+        targets = []
         for source_id, target_ids in self.graph.items():
             for target_id in target_ids:
-                incoming[target_id].append(source_id)
+                sources.append(position[source_id])
+                targets.append(position[target_id])
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
 
         # Count outgoing links
-        outgoing_count = {}
-        for url_id in self.id_to_url.keys():
-            count = len(self.graph.get(url_id, []))
-            outgoing_count[url_id] = count if count > 0 else 1  # Avoid division by zero
+        out_degree = np.bincount(sources, minlength=n).astype(np.float64)
+        dangling = out_degree == 0
+
+        # Transition matrix transposed (rows = targets, cols = sources),
+        # each edge weighted by 1 / out_degree of its source
+        weights = 1.0 / out_degree[sources] if len(sources) else np.empty(0)
+        transition = csr_matrix((weights, (targets, sources)), shape=(n, n))
 
         # Power iteration
         print(f"Computing PageRank ({self.iterations} iterations)...")
+        pr = np.full(n, 1.0 / n)
         for iteration in range(self.iterations):
-            new_pagerank = {}
-
-            for url_id in self.id_to_url.keys():
-                # Random surfer component
-                rank = (1 - self.damping) / n
-
-                # Link-based component
-                link_sum = 0.0
-                for source_id in incoming.get(url_id, []):
-                    link_sum += self.pagerank[source_id] / outgoing_count[source_id]
-
-                rank += self.damping * link_sum
-                new_pagerank[url_id] = rank
-
-            self.pagerank = new_pagerank
+            pr = _pagerank_step(
+                transition.indptr, transition.indices, transition.data,
+                pr, dangling, self.damping
+            )
 
             if (iteration + 1) % 5 == 0:
                 print(f"  Iteration {iteration + 1}/{self.iterations}")
 
+        self.url_ids = url_ids
+        self.pr_array = pr
+
         print("PageRank computation complete!")
 
     def normalize_scores(self):
         """Normalize PageRank scores to [0, 1] range."""
-        if not self.pagerank:
+        if len(self.pr_array) == 0:
             return
 
-        min_score = min(self.pagerank.values())
-        max_score = max(self.pagerank.values())
+        min_score = self.pr_array.min()
+        spread = self.pr_array.max() - min_score
 
-        if max_score - min_score > 0:
-            for url_id in self.pagerank:
-                self.pagerank[url_id] = (self.pagerank[url_id] - min_score) / (max_score - min_score)
+        if spread > 0:
+            self.pr_array = (self.pr_array - min_score) / spread
         else:
             # All scores are the same, set to 0.5
-            for url_id in self.pagerank:
-                self.pagerank[url_id] = 0.5
+            self.pr_array = np.full_like(self.pr_array, 0.5)
 
     def save(self, output_dir):
         """Save PageRank scores to disk."""
@@ -122,17 +146,18 @@ class PageRank:
         self.normalize_scores()
 
         pagerank_file = os.path.join(output_dir, 'pagerank.json')
-        with open(pagerank_file, 'w', encoding='utf-8') as f:
-            json.dump(self.pagerank, f, ensure_ascii=False, indent=2)
+        pagerank = dict(zip(self.url_ids, self.pr_array.tolist()))
+        with open(pagerank_file, 'wb') as f:
+            f.write(orjson.dumps(pagerank, option=orjson.OPT_NON_STR_KEYS))
 
         print(f"PageRank scores saved to {pagerank_file}")
 
         # Print statistics
-        scores = list(self.pagerank.values())
+        scores = self.pr_array
         print(f"Total pages: {len(scores)}")
-        print(f"Min score: {min(scores):.6f}")
-        print(f"Max score: {max(scores):.6f}")
-        print(f"Avg score: {sum(scores) / len(scores):.6f}")
+        print(f"Min score: {scores.min():.6f}")
+        print(f"Max score: {scores.max():.6f}")
+        print(f"Avg score: {scores.mean():.6f}")
 
 
 def compute_pagerank():
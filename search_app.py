@@ -2,7 +2,10 @@
 Flask web application for the search engine.
 """
 
-from flask import Flask, render_template, request, jsonify
+import threading
+from collections import OrderedDict
+import orjson
+from flask import Flask, Response, render_template, request, jsonify
 from search_engine import SearchEngine
 import config
 
@@ -18,6 +21,31 @@ except Exception as e:
     print(f"Error loading search engine: {e}")
     print("Please run indexer.py and pagerank.py first.")
 
+# LRU cache: normalized query -> (num_results, serialized results)
+query_cache = OrderedDict()
+query_cache_lock = threading.Lock()
+
+
+def cached_search(query):
+    """Search with an LRU cache of serialized results."""
+    key = query.lower()
+
+    with query_cache_lock:
+        cached = query_cache.get(key)
+        if cached is not None:
+            query_cache.move_to_end(key)
+            return cached
+
+    results = search_engine.search(query, top_k=config.RESULTS_PER_PAGE)
+    cached = (len(results), orjson.dumps(results))
+
+    with query_cache_lock:
+        query_cache[key] = cached
+        if len(query_cache) > config.QUERY_CACHE_SIZE:
+            query_cache.popitem(last=False)
+
+    return cached
+
 
 @app.route('/')
 def index():
@@ -34,13 +62,14 @@ def search():
         return jsonify({'error': 'No query provided'}), 400
 
     try:
-        results = search_engine.search(query, top_k=config.RESULTS_PER_PAGE)
+        num_results, results_json = cached_search(query)
 
-        return jsonify({
+        body = orjson.dumps({
             'query': query,
-            'num_results': len(results),
-            'results': results
+            'num_results': num_results,
+            'results': orjson.Fragment(results_json)
         })
+        return Response(body, mimetype='application/json')
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -59,7 +88,7 @@ def health():
         'status': 'ok',
         'index_loaded': search_engine.loaded,
         'num_documents': len(search_engine.doc_info) if search_engine.loaded else 0,
-        'num_terms': len(search_engine.index) if search_engine.loaded else 0
+        'num_terms': len(search_engine.terms) if search_engine.loaded else 0
     })
 
 
@@ -3,25 +3,52 @@ Search Engine: Core search functionality with combined ranking.
 """
 
 import os
-import json
 import math
 from collections import defaultdict
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+import numpy as np
+import orjson
+from numba import njit
 import config
+from text_utils import STOP_WORDS, TOKEN_RE
+
+
+@njit(cache=True)
+def _accumulate_postings(postings, weights, q_weight, add_new_docs, scores, seen):
+    """Decode one term's varint doc number gaps and add its weights to scores."""
+    doc_num = 0
+    gap = 0
+    shift = 0
+    i = 0
+    for byte in postings:
+        gap |= np.int64(byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+
+        doc_num += gap
+        if add_new_docs or seen[doc_num]:
+            scores[doc_num] += q_weight * weights[i]
+            seen[doc_num] = True
+
+        gap = 0
+        shift = 0
+        i += 1
 
 
 class SearchEngine:
     """Search engine with vector space model and PageRank ranking."""
 
     def __init__(self):
-        self.index = {}
-        self.idf = {}
-        self.doc_lengths = {}
-        self.doc_info = {}
-        self.pagerank = {}
-        self.stop_words = set(stopwords.words(config.STOP_WORDS_LANGUAGE))
+        self.terms = {}  # term -> term number
+        self.term_offsets = None  # term number -> start of its posting weights
+        self.postings = None  # concatenated postings: varint doc number gaps
+        self.posting_offsets = None  # term number -> byte offset into postings
+        self.weights = None  # concatenated postings: normalized TF-IDF weights
+        self.idf = None  # term number -> IDF
+        self.max_weights = None  # term number -> largest document weight
+        self.doc_info = []  # doc number -> {doc_id, url, title, token_count}
+        self.pagerank = None  # doc number -> PageRank score
+        self.stop_words = STOP_WORDS
         self.loaded = False
 
     def load_index(self):
@@ -31,148 +58,137 @@ class SearchEngine:
         if not os.path.exists(index_dir):
             raise FileNotFoundError(f"Index directory not found: {index_dir}")
 
-        # Load inverted index
-        index_file = os.path.join(index_dir, 'inverted_index.json')
-        with open(index_file, 'r', encoding='utf-8') as f:
-            self.index = json.load(f)
+        # Load vocabulary
+        terms_file = os.path.join(index_dir, 'terms.txt')
+        with open(terms_file, 'r', encoding='utf-8') as f:
+            self.terms = {term: i for i, term in enumerate(f.read().split())}
 
-        # Load IDF scores
-        idf_file = os.path.join(index_dir, 'idf.json')
-        with open(idf_file, 'r', encoding='utf-8') as f:
-            self.idf = json.load(f)
+        # Memory-map inverted index, posting weights and IDF scores; processes
+        # forked after loading (e.g. gunicorn --preload) share the pages
+        def load_array(name):
+            return np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r')
 
-        # Load document lengths
-        lengths_file = os.path.join(index_dir, 'doc_lengths.json')
-        with open(lengths_file, 'r', encoding='utf-8') as f:
-            self.doc_lengths = json.load(f)
+        self.term_offsets = load_array('term_offsets')
+        self.postings = load_array('postings')
+        self.posting_offsets = load_array('posting_offsets')
+        self.weights = load_array('weights')
+        self.idf = load_array('idf')
+        self.max_weights = load_array('max_weights')
 
         # Load document info
         info_file = os.path.join(index_dir, 'doc_info.json')
-        with open(info_file, 'r', encoding='utf-8') as f:
-            self.doc_info = json.load(f)
+        with open(info_file, 'rb') as f:
+            self.doc_info = orjson.loads(f.read())
 
         # Load PageRank scores
         pagerank_file = os.path.join(index_dir, 'pagerank.json')
-        with open(pagerank_file, 'r', encoding='utf-8') as f:
-            self.pagerank = json.load(f)
+        with open(pagerank_file, 'rb') as f:
+            pagerank = {int(url_id): score for url_id, score in orjson.loads(f.read()).items()}
+
+        # Align PageRank scores with doc numbers
+        self.pagerank = np.array(
+            [pagerank.get(info['doc_id'], 0.0) for info in self.doc_info],
+            dtype=np.float64
+        )
 
         self.loaded = True
-        print(f"Loaded index: {len(self.index)} terms, {len(self.doc_info)} documents")
+        print(f"Loaded index: {len(self.terms)} terms, {len(self.doc_info)} documents")
 
     def tokenize_query(self, query):
         """Tokenize and normalize query."""
-        # Convert to lowercase
-        query = query.lower()
-
-        # Tokenize
-        tokens = word_tokenize(query)
-
-        # Filter tokens
-        filtered_tokens = []
-        for token in tokens:
-            # Keep only alphabetic tokens
-            if not token.isalpha():
-                continue
+        # Same tokenization as the indexer so query terms match index terms
+        return [token for token in TOKEN_RE.findall(query.lower())
+                if token not in self.stop_words]
 
-            # Check length
-            if len(token) < config.MIN_TERM_LENGTH or len(token) > config.MAX_TERM_LENGTH:
-                continue
+    def calculate_cosine_similarity(self, query_tokens, min_score=0.0):
+        """Calculate cosine similarity scores for all documents.
 
-            # Remove stopwords
-            if token in self.stop_words:
-                continue
-
-            filtered_tokens.append(token)
-
-        return filtered_tokens
-
-    def calculate_cosine_similarity(self, query_tokens):
-        """Calculate cosine similarity scores for all documents."""
+        Returns a dense array indexed by doc number. Documents that can no
+        longer reach min_score are not scored.
+        """
         # Calculate query term frequencies
         query_tf = defaultdict(int)
         for token in query_tokens:
             query_tf[token] += 1
 
-        # Calculate query vector with TF-IDF weights
+        # Calculate query vector with TF-IDF weights, keyed by term number
         query_vector = {}
         query_length = 0.0
 
         for term, tf in query_tf.items():
-            if term in self.idf:
-                weight = tf * self.idf[term]
-                query_vector[term] = weight
+            if term in self.terms:
+                term_num = self.terms[term]
+                weight = tf * self.idf[term_num]
+                query_vector[term_num] = weight
                 query_length += weight ** 2
 
+        # Dense score accumulator over all doc numbers
+        scores = np.zeros(len(self.doc_info), dtype=np.float32)
+
         if query_length == 0:
-            return {}
+            return scores
 
         query_length = math.sqrt(query_length)
 
         # Normalize query vector
-        for term in query_vector:
-            query_vector[term] /= query_length
-
-        # Calculate similarity for each document
-        scores = {}
+        for term_num in query_vector:
+            query_vector[term_num] /= query_length
 
-        for term, q_weight in query_vector.items():
-            if term not in self.index:
-                continue
+        # Process terms with the shortest posting lists first
+        order = sorted(
+            query_vector,
+            key=lambda t: self.term_offsets[t + 1] - self.term_offsets[t]
+        )
 
-            postings = self.index[term]
-            idf = self.idf[term]
+        # Most each term can add to any single document's score
+        max_contribs = [query_vector[t] * self.max_weights[t] for t in order]
+        remaining = sum(max_contribs)
 
-            for doc_id, tf in postings.items():
-                # Calculate TF-IDF weight for document
-                d_weight = tf * idf
-
-                # Normalize by document length
-                if doc_id in self.doc_lengths and self.doc_lengths[doc_id] > 0:
-                    d_weight /= self.doc_lengths[doc_id]
-
-                # Add to similarity score
-                if doc_id not in scores:
-                    scores[doc_id] = 0.0
-                scores[doc_id] += q_weight * d_weight
+        # Calculate similarity for each document
+        seen = np.zeros(len(self.doc_info), dtype=bool)
+
+        for term_num, max_contrib in zip(order, max_contribs):
+            # Documents not seen so far can gain at most `remaining`; once
+            # that is below min_score only existing candidates are updated
+            add_new_docs = remaining >= min_score
+            remaining -= max_contrib
+
+            if not add_new_docs and not seen.any():
+                break
+
+            # Decode and accumulate in one compiled pass over the postings
+            _accumulate_postings(
+                self.postings[self.posting_offsets[term_num]:self.posting_offsets[term_num + 1]],
+                self.weights[self.term_offsets[term_num]:self.term_offsets[term_num + 1]],
+                query_vector[term_num],
+                add_new_docs,
+                scores,
+                seen
+            )
 
         return scores
 
     def normalize_scores(self, scores):
-        """Normalize scores to [0, 1] range."""
-        if not scores:
-            return {}
-
-        min_score = min(scores.values())
-        max_score = max(scores.values())
-
-        if max_score - min_score > 0:
-            normalized = {}
-            for doc_id, score in scores.items():
-                normalized[doc_id] = (score - min_score) / (max_score - min_score)
-            return normalized
+        """Normalize an array of scores to [0, 1] range."""
+        if len(scores) == 0:
+            return scores
+
+        min_score = scores.min()
+        spread = scores.max() - min_score
+
+        if spread > 0:
+            return (scores - min_score) / spread
         else:
             # All scores are the same
-            return {doc_id: 0.5 for doc_id in scores}
+            return np.full_like(scores, 0.5)
 
     def combine_scores(self, cosine_scores, pagerank_scores):
-        """Combine cosine similarity and PageRank scores."""
-        # Normalize cosine scores
-        normalized_cosine = self.normalize_scores(cosine_scores)
-
-        # ONLY use documents that match the query (have cosine similarity > 0)
-        # This prevents irrelevant pages from appearing just because of high PageRank
-        combined = {}
-        for doc_id in normalized_cosine.keys():
-            cos_score = normalized_cosine[doc_id]
-            pr_score = pagerank_scores.get(doc_id, 0.0)
-
-            # Combined score: w1 * cosine + w2 * pagerank
-            combined[doc_id] = (
-                config.WEIGHT_COSINE * cos_score +
-                config.WEIGHT_PAGERANK * pr_score
-            )
-
-        return combined
+        """Combine aligned arrays of cosine similarity and PageRank scores."""
+        # Combined score: w1 * normalized cosine + w2 * pagerank
+        return (
+            config.WEIGHT_COSINE * self.normalize_scores(cosine_scores) +
+            config.WEIGHT_PAGERANK * pagerank_scores
+        )
 
     def search(self, query, top_k=10, min_cosine_threshold=0.01):
         """Search for documents matching the query."""
@@ -186,41 +202,38 @@ class SearchEngine:
             return []
 
         # Calculate cosine similarity scores
-        cosine_scores = self.calculate_cosine_similarity(query_tokens)
-
-        if not cosine_scores:
-            return []
+        cosine_scores = self.calculate_cosine_similarity(query_tokens, min_cosine_threshold)
 
         # Filter out documents with very low relevance (before normalization)
         # This prevents irrelevant pages from appearing just due to high PageRank
-        filtered_cosine_scores = {
-            doc_id: score
-            for doc_id, score in cosine_scores.items()
-            if score >= min_cosine_threshold
-        }
+        matched = np.flatnonzero((cosine_scores > 0) & (cosine_scores >= min_cosine_threshold))
 
-        if not filtered_cosine_scores:
+        if len(matched) == 0:
             return []
 
         # Combine with PageRank scores (only for relevant documents)
-        final_scores = self.combine_scores(filtered_cosine_scores, self.pagerank)
+        final_scores = self.combine_scores(cosine_scores[matched], self.pagerank[matched])
 
-        # Sort by score
-        ranked_docs = sorted(final_scores.items(), key=lambda x: x[1], reverse=True)
+        # Select top-k without sorting every match
+        if len(final_scores) > top_k:
+            top = np.argpartition(-final_scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(final_scores))
+        top = top[np.argsort(-final_scores[top], kind='stable')]
 
         # Get top-k results
         results = []
-        for doc_id, score in ranked_docs[:top_k]:
-            if doc_id in self.doc_info:
-                result = {
-                    'doc_id': doc_id,
-                    'url': self.doc_info[doc_id]['url'],
-                    'title': self.doc_info[doc_id]['title'],
-                    'score': score,
-                    'cosine_score': cosine_scores.get(doc_id, 0.0),
-                    'pagerank_score': self.pagerank.get(doc_id, 0.0)
-                }
-                results.append(result)
+        for doc_num, score in zip(matched[top].tolist(), final_scores[top].tolist()):
+            info = self.doc_info[doc_num]
+            result = {
+                'doc_id': f"{info['doc_id']:016x}",  # 64-bit ID as hex, exact in JS
+                'url': info['url'],
+                'title': info['title'],
+                'score': score,
+                'cosine_score': float(cosine_scores[doc_num]),
+                'pagerank_score': float(self.pagerank[doc_num])
+            }
+            results.append(result)
 
         return results
 
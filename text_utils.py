@@ -0,0 +1,21 @@
+"""
+Text utilities shared by the indexer and the search engine.
+"""
+
+import re
+import nltk
+from nltk.corpus import stopwords
+import config
+
+
+# Whole alphabetic words (Unicode letters) within the configured length bounds;
+# overlong words and words mixed with digits are dropped entirely
+TOKEN_RE = re.compile(r'\b[^\W\d_]{%d,%d}\b' % (config.MIN_TERM_LENGTH, config.MAX_TERM_LENGTH))
+
+# Download NLTK data if needed
+try:
+    nltk.data.find('corpora/stopwords')
+except LookupError:
+    nltk.download('stopwords', quiet=True)
+
+STOP_WORDS = frozenset(stopwords.words(config.STOP_WORDS_LANGUAGE))